@@ -0,0 +1,147 @@
+"""Differential conformance checks between game engines.
+
+An engine is any module providing the same classes as `models`. Engines are
+driven in lockstep from the same seed and action stream, each with its own
+copy of the global random state, and compared after every step.
+"""
+import collections
+import random
+import time
+
+from . import models
+
+
+ENGINES = [models]
+DIRECTIONS = ['left', 'right', 'up', 'down']
+
+Report = collections.namedtuple('Report', 'seed trace step expected actual speedup')
+
+
+def random_actions(seed, count, max_duration=500):
+    """Generate a reproducible stream of (method, args...) actions."""
+    rng = random.Random(seed)
+    actions = []
+    for x in range(count):
+        roll = rng.random()
+        if roll < 0.5:
+            actions.append(('move', 0, rng.choice(DIRECTIONS)))
+        elif roll < 0.75:
+            actions.append(('attack', 0))
+        else:
+            actions.append(('synchronize', rng.randint(1, max_duration)))
+    return actions
+
+
+class Runner(object):
+    """Drive one engine, keeping its random state separate from the others.
+
+    An unexpected exception is the usual way an engine diverges, so it is
+    kept as crash (the exception type name) and compared like any other
+    state; the runner stops stepping afterwards.
+    """
+    def __init__(self, engine, seed, sync, acceleration):
+        self.engine = engine
+        self.model = None
+        self.over = False
+        self.crash = None
+        self.elapsed = 0.0
+
+        outer = random.getstate()
+        random.seed(seed)
+        try:
+            self.model = engine.Marathon(sync, acceleration)
+        except Exception as error:
+            self.crash = type(error).__name__
+        finally:
+            self._state = random.getstate()
+            random.setstate(outer)
+
+    def step(self, action):
+        if self.over or self.crash:
+            return
+
+        outer = random.getstate()
+        random.setstate(self._state)
+        start = time.perf_counter()
+        try:
+            getattr(self.model, action[0])(*action[1:])
+        except self.engine.GameOver:
+            self.over = True
+        except Exception as error:
+            self.crash = type(error).__name__
+        finally:
+            self.elapsed += time.perf_counter() - start
+            self._state = random.getstate()
+            random.setstate(outer)
+
+    def snapshot(self):
+        """Everything observable about the game, minus piece identities."""
+        if not self.crash:
+            try:
+                pieces = sorted((type, position, direction)
+                                for id, type, position, direction in self.model.pieces)
+                return (pieces, self.model.score, self.model.quota,
+                        self.model.level, self.over, None)
+            except Exception as error:
+                self.crash = type(error).__name__
+        # A crashed model may be half mutated; only the crash is comparable
+        return (None, None, None, None, self.over, self.crash)
+
+
+def diverges(reference, candidate, seed, actions, sync=2000, acceleration=10):
+    """Return (step, expected, actual) for the first mismatch, else None.
+
+    Step 0 is the freshly constructed game; step n follows actions[n - 1].
+    """
+    expected = Runner(reference, seed, sync, acceleration)
+    actual = Runner(candidate, seed, sync, acceleration)
+
+    for step in range(len(actions) + 1):
+        if step:
+            expected.step(actions[step - 1])
+            actual.step(actions[step - 1])
+        if expected.snapshot() != actual.snapshot():
+            return step, expected.snapshot(), actual.snapshot()
+    return None
+
+
+def shrink(reference, candidate, seed, actions, **kwargs):
+    """Reduce a diverging action list to a locally minimal one."""
+    actions = list(actions)
+    chunk = len(actions) // 2
+    while chunk:
+        start = 0
+        while start < len(actions):
+            trial = actions[:start] + actions[start + chunk:]
+            if diverges(reference, candidate, seed, trial, **kwargs):
+                actions = trial
+            else:
+                start += chunk
+        chunk //= 2
+    return actions
+
+
+def timing(engine, seed, actions, sync=2000, acceleration=10):
+    runner = Runner(engine, seed, sync, acceleration)
+    for action in actions:
+        runner.step(action)
+    return runner.elapsed
+
+
+def check(candidate, seed, count=1000, reference=models, **kwargs):
+    """Compare candidate against reference on a random action stream.
+
+    Returns a Report; trace is empty and step None when the engines agree.
+    speedup is reference time over candidate time.
+    """
+    actions = random_actions(seed, count)
+    divergence = diverges(reference, candidate, seed, actions, **kwargs)
+    if divergence:
+        trace = shrink(reference, candidate, seed, actions, **kwargs)
+        step, expected, actual = diverges(reference, candidate, seed, trace, **kwargs)
+        return Report(seed, trace, step, expected, actual, None)
+
+    reference_time = timing(reference, seed, actions, **kwargs)
+    candidate_time = timing(candidate, seed, actions, **kwargs)
+    speedup = reference_time / candidate_time if candidate_time else float('inf')
+    return Report(seed, [], None, None, None, speedup)
@@ -1,14 +1,20 @@
+import array
+import collections
+import heapq
 import random
 import itertools
 import os
 
 from .mvc import mutator, observable
+from . import telemetry
 
 
 class TooManyPieces(Exception):
     """Too many pieces have been added."""
 class GameOver(Exception):
     """Game over, man! Game over!"""
+class PlayerNotFound(Exception):
+    """No player with that number."""
 
 
 class Coord(object):
@@ -103,6 +109,8 @@ class Line(object):
     """
     def __init__(self, max, types):
         self._pieces = []
+        # [type, count] runs; _runs[0] is the end facing the player
+        self._runs = collections.deque()
         self.max = max
         self.types = types
         self._good_types = [type for type in self.types if type]
@@ -128,6 +136,10 @@ class Line(object):
                    random.choice(self._good_types)
         piece = Piece(type)
         self._pieces.insert(0, piece)
+        if self._runs and self._runs[-1][0] == type:
+            self._runs[-1][1] += 1
+        else:
+            self._runs.append([type, 1])
         return piece
 
     def fill(self):
@@ -139,8 +151,30 @@ class Line(object):
         while self._pieces and player.attack(self._pieces[-1]):
             self._pieces.pop()
             removed += 1
+
+        if removed:
+            self._shrink_front(removed)
+        if self._pieces and self._pieces[-1].type != self._runs[0][0]:
+            # Player swapped types with the front piece
+            self._shrink_front(1)
+            type = self._pieces[-1].type
+            if self._runs and self._runs[0][0] == type:
+                self._runs[0][1] += 1
+            else:
+                self._runs.appendleft([type, 1])
         return removed
 
+    def _shrink_front(self, count):
+        self._runs[0][1] -= count
+        if not self._runs[0][1]:
+            self._runs.popleft()
+
+    def preview(self, type):
+        """Number of pieces an attack of type would clear, without attacking."""
+        if self._runs and self._runs[0][0] == type:
+            return self._runs[0][1]
+        return 0
+
     @property
     def previous(self):
         return self._pieces[0].type if self else False
@@ -182,6 +216,9 @@ class Plane(object):
     def intersect(self, num, player):
         return self._lines[int(num)].intersect(player)
 
+    def preview(self, num, type):
+        return self._lines[int(num)].preview(type)
+
 
 class Board(object):
     """
@@ -256,7 +293,7 @@ class Board(object):
             'down': 'up',
         }
 
-        self._next = random.choice(self._planes.values())
+        self._next = random.choice(list(self._planes.values()))
         self._flat = None
 
     def _left_offset(self, internal_position):
@@ -283,6 +320,12 @@ class Board(object):
     def __len__(self):
         return sum(len(plane) for plane in self._planes.values())
 
+    @property
+    def size(self):
+        """External (width, height) in cells."""
+        return (2*self._length_x + self._player_x,
+                2*self._length_y + self._player_y)
+
     def __iter__(self):
         for player, int_pos, direction in zip(self._players,
                                               self._player_positions,
@@ -308,7 +351,7 @@ class Board(object):
             self._player_directions[player_num] = direction
             position = self._player_positions[player_num]
         except IndexError:
-            raise PlayerNotFound(num)
+            raise PlayerNotFound(player_num)
         target = position + {
             'left': Coord(-1, 0),
             'right': Coord(1, 0),
@@ -334,31 +377,204 @@ class Board(object):
         plane = self._planes[direction]
         self._player_directions[num] = self._flip[direction]
 
+        return plane.intersect(self._line_number(position, direction), player)
+
+    def preview(self, num, position, direction):
+        """Pieces player num would clear attacking from position towards
+        direction, without changing the board.
+        """
+        plane = self._planes[direction]
+        return plane.preview(self._line_number(position, direction),
+                             self._players[num].type)
+
+    def previews(self, num):
+        """Map every (position, direction) in the player area to its preview."""
+        previews = {}
+        for x in range(self._player_x):
+            for y in range(self._player_y):
+                position = Coord(x, y)
+                for direction in self._planes:
+                    previews[position, direction] = self.preview(num, position, direction)
+        return previews
+
+    def _line_number(self, position, direction):
         if direction in ('left', 'right'):
-            return plane.intersect(position.y, player)
+            return position.y
         else:
-            return plane.intersect(position.x, player)
+            return position.x
+
+
+class Scheduler(object):
+    """Heap of timed callbacks sharing one game clock.
+
+    Elapsed time is multiplied by scale: 0 pauses, 0.5 is slow motion and
+    2 is fast-forward. Callbacks reschedule themselves to repeat.
+    """
+    def __init__(self):
+        self.now = 0
+        self.scale = 1
+        self._events = []
+        self._order = itertools.count()
+
+    def __len__(self):
+        return len(self._events)
+
+    def schedule(self, delay, callback):
+        heapq.heappush(self._events, (self.now + delay, next(self._order), callback))
+
+    def remaining(self):
+        """Real time until the next event, or None if nothing will fire."""
+        if not self._events or not self.scale:
+            return None
+        return max(self._events[0][0] - self.now, 0) / float(self.scale)
+
+    def advance(self, duration):
+        self._run_until(self.now + duration * self.scale)
+
+    def skip(self):
+        """Jump straight to the next event, returning the game time skipped."""
+        if not self._events:
+            return 0
+        skipped = self._events[0][0] - self.now
+        self._run_until(self._events[0][0])
+        return skipped
+
+    def _run_until(self, target):
+        while self._events and self._events[0][0] <= target:
+            due, order, callback = heapq.heappop(self._events)
+            self.now = due
+            callback()
+        self.now = target
+
+
+EXPORT_TYPES = ['piece%s' % type for type in PIECE_TYPES] + \
+               ['player%s' % type for type in PIECE_TYPES]
+EXPORT_DIRECTIONS = ['left', 'right', 'up', 'down']
+EXPORT_FIELDS = ['type', 'x', 'y', 'direction', 'id']
+EMPTY = -1
+
+
+class BoardState(object):
+    """Flat buffer of native int64 records, one per cell in row-major order:
+    (type, x, y, direction, id). Type and direction index EXPORT_TYPES and
+    EXPORT_DIRECTIONS, or are EMPTY.
+
+    The buffer is rewritten in place after every mutation that changes the
+    board and version is bumped, so readers can hold on to view and skip
+    work while version is unchanged. Needs Python 3.8 for the 'q' typecode
+    and memoryview.toreadonly().
+    """
+    def __init__(self, model):
+        self.model = model
+        self.version = 0
+        self.columns, self.rows = model.size
+
+        cells = self.columns * self.rows
+        self._cells = array.array('q', [EMPTY, 0, 0, EMPTY, 0] * cells)
+        for y in range(self.rows):
+            for x in range(self.columns):
+                offset = (y * self.columns + x) * len(EXPORT_FIELDS)
+                self._cells[offset + 1] = x
+                self._cells[offset + 2] = y
+        self._scratch = array.array('q', self._cells)
+        self._blank = array.array('q', [EMPTY] * cells)
+        self._unused = array.array('q', [0] * cells)
+        self._types = dict((name, code) for code, name in enumerate(EXPORT_TYPES))
+        self._directions = dict((name, code) for code, name in enumerate(EXPORT_DIRECTIONS))
+
+        self.update()
+
+    def __len__(self):
+        return self.columns * self.rows
+
+    def __iter__(self):
+        """Iterate (type, x, y, direction, id) for each occupied cell."""
+        cells = self._cells
+        width = len(EXPORT_FIELDS)
+        for offset in range(0, len(cells), width):
+            if cells[offset] != EMPTY:
+                yield tuple(cells[offset:offset + width])
+
+    def update(self):
+        cells = self._scratch
+        width = len(EXPORT_FIELDS)
+        cells[0::width] = self._blank
+        cells[3::width] = self._blank
+        cells[4::width] = self._unused
+
+        for piece, position, direction in self.model._board:
+            offset = (int(position.y) * self.columns + int(position.x)) * width
+            cells[offset] = self._types[str(piece)]
+            cells[offset + 3] = self._directions[direction]
+            cells[offset + 4] = id(piece)
+
+        if cells != self._cells:
+            # Same length, so the buffer is not reallocated under readers
+            self._cells[:] = cells
+            self.version += 1
+
+    @property
+    def view(self):
+        """Read-only memoryview shaped (cells, fields); no copy is made."""
+        return memoryview(self._cells).toreadonly().cast('B').cast(
+            'q', (len(self), len(EXPORT_FIELDS)))
+
+    def as_numpy(self):
+        """Read-only NumPy structured array over the buffer; no copy is made."""
+        import numpy
+
+        dtype = numpy.dtype([(name, '=i8') for name in EXPORT_FIELDS])
+        return numpy.frombuffer(memoryview(self._cells).toreadonly(), dtype=dtype)
 
 
 class Game(object):
     @observable
-    def __init__(self):
+    def __init__(self, recorder=None):
         self.score = 0
         self._board = Board(4, 4,
                             6, 4,
                             1, PIECE_TYPES)
         self._pieces = None
+        self._state = None
+        self._recorder = recorder
+        # Telemetry session id, telling this game apart in a shared log
+        self.session = recorder.new_session() if recorder else None
+        self.scheduler = Scheduler()
 
     @mutator
     def move(self, *args, **kwargs):
         self._board.move(*args, **kwargs)
 
+    def previews(self, num=0):
+        """Attack outcomes for player num; see Board.previews."""
+        return self._board.previews(num)
+
+    @property
+    def size(self):
+        return self._board.size
+
+    def export(self):
+        """The shared BoardState for this game, created on first use."""
+        if self._state is None:
+            self._state = BoardState(self)
+            # Refresh ahead of every other observer so none reads a stale board
+            self._observers.insert(0, self._state)
+        return self._state
+
     @property
     def pieces(self):
         """Iterate (id, type, position, direction) for each piece."""
         for piece, position, direction in self._board:
             yield id(piece), str(piece), tuple(position), str(direction)
 
+    def synchronize(self, duration):
+        self._record(telemetry.FRAME, duration)
+        self.scheduler.advance(duration)
+
+    def _record(self, kind, value=0):
+        if self._recorder:
+            self._recorder.record(kind, value, self.session)
+
 
 class Marathon(Game):
     def __init__(self, sync, acceleration, *args, **kwargs):
@@ -370,30 +586,33 @@ class Marathon(Game):
 
         self._sync = sync
         self._acceleration = acceleration
-        self._next_piece = self._delay()
+        self.scheduler.schedule(self._delay(), self._spawn)
 
     @mutator
     def attack(self, *args, **kwargs):
         pieces = self._board.attack(*args, **kwargs)
+        self._record(telemetry.CLEAR, pieces)
         self.score += pieces * 100
         self.quota -= pieces
 
         if self.quota <= 0:
             self._update_quota()
             self.level += 1
+            self._record(telemetry.LEVEL_UP, self.level)
 
     @mutator
     def _add_piece(self):
         try:
             self._board.add()
         except TooManyPieces:
+            self._record(telemetry.GAME_OVER, self.score)
             raise GameOver
+        self._record(telemetry.SPAWN)
 
-    def synchronize(self, duration):
-        self._next_piece -= duration
-        while self._next_piece <= 0:
-            self._add_piece()
-            self._next_piece += self._delay()
+    def _spawn(self):
+        self._add_piece()
+        # Delay is read on every spawn so level changes speed up the next one
+        self.scheduler.schedule(self._delay(), self._spawn)
 
     def _delay(self):
         return self._sync - self.level * self._acceleration
@@ -409,18 +628,23 @@ class Timed(Game):
 
         self._board.fill()
         self._sync = sync
-        self._next_tick = self._sync
+        self.scheduler.schedule(self._sync, self._tick)
 
     @mutator
     def attack(self, *args, **kwargs):
         pieces = self._board.attack(*args, **kwargs)
+        self._record(telemetry.CLEAR, pieces)
         self.score += pieces * 100
 
+    def _tick(self):
+        # Count down in its own mutator so observers see the final time
+        # before GameOver is raised
+        self._count_down()
+        if self.time_left <= 0:
+            self._record(telemetry.GAME_OVER, self.score)
+            raise GameOver
+        self.scheduler.schedule(self._sync, self._tick)
+
     @mutator
-    def synchronize(self, duration):
-        self._next_piece -= duration
-        while self._next_tick <= 0:
-            self.time_left -= 1
-            if self.time_left <= 0:
-                raise GameOver
-            self._next_tick += self._sync
+    def _count_down(self):
+        self.time_left -= 1
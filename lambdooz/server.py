@@ -0,0 +1,297 @@
+import argparse
+import asyncio
+import collections
+import heapq
+import itertools
+import json
+import logging
+import time
+
+from . import models, telemetry
+from .mvc import observer
+
+
+DIRECTIONS = ['left', 'right', 'up', 'down']
+
+log = logging.getLogger(__name__)
+
+
+def encode(message):
+    return (json.dumps(message, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+class Session(object):
+    """One authoritative game and the connection that plays it."""
+    @observer
+    def __init__(self, model, writer, now):
+        self.model = model
+        self.writer = writer
+        self.inputs = collections.deque()
+        self.clock = now
+        self.due = None
+        self.version = None
+        self.dirty = True
+        self.over = False
+
+    def update(self):
+        self.dirty = True
+
+    def handle(self, message):
+        action = message.get('action')
+        if action == 'move' and message.get('direction') in DIRECTIONS:
+            self.model.move(0, message['direction'])
+        elif action == 'attack':
+            self.model.attack(0)
+
+    def frame(self):
+        """Pieces are only included when the board changed since the last frame."""
+        frame = {'score': self.model.score}
+        state = self.model.export()
+        if state.version != self.version:
+            frame['pieces'] = [[models.EXPORT_TYPES[type], x, y,
+                                models.EXPORT_DIRECTIONS[direction]]
+                               for type, x, y, direction, id in state]
+            self.version = state.version
+        for name in ('level', 'quota', 'time_left'):
+            if hasattr(self.model, name):
+                frame[name] = getattr(self.model, name)
+        if self.over:
+            frame['game_over'] = True
+        return frame
+
+    def send(self):
+        self.writer.write(encode(self.frame()))
+        self.dirty = False
+
+    @property
+    def backlog(self):
+        """Bytes written but not yet accepted by the socket."""
+        return self.writer.transport.get_write_buffer_size()
+
+
+class Host(object):
+    """Run many sessions from one shared tick loop.
+
+    Sessions are only stepped when their scheduler has an event due or
+    input has arrived. Wire format is one JSON object per line each way:
+    clients send {"action": "move", "direction": "left"} or
+    {"action": "attack"} and receive a state frame after every change,
+    carrying "pieces" only when the board itself changed.
+
+    Frames are never awaited per client; instead a session whose unsent
+    backlog exceeds max_backlog bytes is dropped.
+    """
+    def __init__(self, factory=None, max_backlog=64 * 1024):
+        self.factory = factory or (lambda: models.Marathon(2000, 10))
+        self.max_backlog = max_backlog
+        self.sessions = set()
+        self.dropped = 0
+        self.failed = 0
+        self.ticks = 0
+        self._started = (time.time(), time.process_time())
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+        self._timers = []
+        self._order = itertools.count()
+        self._ready = set()
+        # Created by run(); before Python 3.10 an Event binds to the loop
+        # current at construction, which may not be the one serving
+        self._wake = None
+
+    async def serve_tcp(self, host='127.0.0.1', port=0):
+        return await asyncio.start_server(self.connect, host, port)
+
+    async def serve_unix(self, path):
+        return await asyncio.start_unix_server(self.connect, path)
+
+    async def connect(self, reader, writer):
+        now = asyncio.get_running_loop().time()
+        session = Session(self.factory(), writer, now)
+        self.sessions.add(session)
+        self._notify(session)
+        try:
+            while not session.over:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    continue
+                if isinstance(message, dict):
+                    session.inputs.append(message)
+                    self._notify(session)
+        finally:
+            self._close(session)
+
+    def _notify(self, session):
+        self._ready.add(session)
+        if self._wake:
+            self._wake.set()
+
+    def _close(self, session, abort=False):
+        if session in self.sessions:
+            self.sessions.discard(session)
+            if abort:
+                # Don't wait to flush what the client isn't reading
+                session.writer.transport.abort()
+            else:
+                session.writer.close()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        if self._ready:
+            self._wake.set()
+        while True:
+            timeout = None
+            if self._timers:
+                timeout = max(self._timers[0][0] - loop.time(), 0)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            self.tick(loop.time())
+
+    def tick(self, now):
+        ready, self._ready = self._ready, set()
+        while self._timers and self._timers[0][0] <= now:
+            due, order, session = heapq.heappop(self._timers)
+            # Entries are left in the heap when a session is rescheduled
+            if session.due != due or session not in self.sessions:
+                continue
+            latency = now - due
+            self.ticks += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            ready.add(session)
+
+        for session in ready:
+            if session in self.sessions:
+                self._step(session, now)
+
+    def _step(self, session, now):
+        try:
+            session.model.synchronize((now - session.clock) * 1000)
+            session.clock = now
+            while session.inputs:
+                session.handle(session.inputs.popleft())
+        except models.GameOver:
+            session.over = True
+        except Exception:
+            # One broken game must not stop the loop for everyone else
+            log.exception('closing session after error')
+            self.failed += 1
+            self._close(session, abort=True)
+            return
+
+        if session.dirty or session.over:
+            session.send()
+            if session.backlog > self.max_backlog:
+                log.warning('dropping session with %d bytes unsent', session.backlog)
+                self.dropped += 1
+                self._close(session, abort=True)
+                return
+        if session.over:
+            self._close(session)
+            return
+
+        remaining = session.model.scheduler.remaining()
+        if remaining is None:
+            session.due = None
+        else:
+            session.due = now + remaining / 1000.0
+            heapq.heappush(self._timers, (session.due, next(self._order), session))
+
+    def report(self):
+        """Load and timer latency (seconds) since the host started.
+
+        The host runs on a single core, so cpu_load is the share of that core
+        in use and sessions_per_core projects how many sessions one fully
+        busy core would carry at the current per-session cost.
+        """
+        wall = time.time() - self._started[0]
+        cpu = time.process_time() - self._started[1]
+        cpu_load = cpu / wall if wall else 0.0
+        return {
+            'sessions': len(self.sessions),
+            'cpu_load': cpu_load,
+            'sessions_per_core': len(self.sessions) / cpu_load if cpu_load else None,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'ticks': self.ticks,
+            'mean_tick_latency': self.latency_total / self.ticks if self.ticks else 0.0,
+            'max_tick_latency': self.latency_max,
+        }
+
+
+class Client(object):
+    """Minimal client speaking the Host wire format."""
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+
+    @classmethod
+    async def open_tcp(cls, host, port):
+        return cls(*(await asyncio.open_connection(host, port)))
+
+    @classmethod
+    async def open_unix(cls, path):
+        return cls(*(await asyncio.open_unix_connection(path)))
+
+    def move(self, direction):
+        self._writer.write(encode({'action': 'move', 'direction': direction}))
+
+    def attack(self):
+        self._writer.write(encode({'action': 'attack'}))
+
+    async def receive(self):
+        line = await self._reader.readline()
+        return json.loads(line.decode('utf-8')) if line else None
+
+    def close(self):
+        self._writer.close()
+
+
+async def serve(host, args):
+    if args.unix:
+        server = await host.serve_unix(args.unix)
+    else:
+        server = await host.serve_tcp(args.host, args.port)
+    asyncio.get_running_loop().create_task(host.run())
+
+    async with server:
+        while True:
+            await asyncio.sleep(args.report or 3600)
+            if args.report:
+                print(json.dumps(host.report()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Host lambdooz games.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='listen on a Unix socket instead')
+    parser.add_argument('--mode', choices=['marathon', 'timed'], default='marathon')
+    parser.add_argument('--report', type=float, default=0,
+                        help='print load statistics every REPORT seconds')
+    parser.add_argument('--telemetry', metavar='FILE',
+                        help='append binary telemetry of every session to FILE')
+    args = parser.parse_args()
+
+    recorder = telemetry.Recorder(args.telemetry) if args.telemetry else None
+    factories = {
+        'marathon': lambda: models.Marathon(2000, 10, recorder=recorder),
+        'timed': lambda: models.Timed(1000, 120, recorder=recorder),
+    }
+    try:
+        asyncio.run(serve(Host(factories[args.mode]), args))
+    finally:
+        if recorder:
+            recorder.close()
+
+
+if __name__ == '__main__':
+    main()
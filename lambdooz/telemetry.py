@@ -0,0 +1,159 @@
+import collections
+import mmap
+import struct
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+SPAWN, CLEAR, LEVEL_UP, FRAME, GAME_OVER = range(5)
+KINDS = ['spawn', 'clear', 'level_up', 'frame', 'game_over']
+
+# timestamp (seconds), session, value, kind, padding to 8 byte alignment
+RECORD = struct.Struct('<dIiB7x')
+
+
+class Recorder(object):
+    """Buffer fixed-width records in memory and hand full buffers to a
+    background thread, so recording never touches the disk.
+
+    Every game recording to it asks for a session id; numbering carries on
+    after the highest session already in the file, so appended runs stay
+    distinct.
+    """
+    def __init__(self, file_name, buffer_size=64 * 1024):
+        self.file_name = file_name
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+        self._queue = queue.Queue()
+        self._clock = time.time
+        try:
+            last = Log(file_name).last_session()
+        except (IOError, OSError):
+            last = None
+        self._sessions = iter(range(0 if last is None else last + 1, 2 ** 32))
+        self._writer = threading.Thread(target=self._write)
+        self._writer.daemon = True
+        self._writer.start()
+
+    def new_session(self):
+        return next(self._sessions)
+
+    def record(self, kind, value=0, session=0):
+        self._buffer += RECORD.pack(self._clock(), session, int(value), kind)
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._queue.put(bytes(self._buffer))
+            self._buffer = bytearray()
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._writer.join()
+
+    def _write(self):
+        with open(self.file_name, 'ab') as log:
+            while True:
+                chunk = self._queue.get()
+                if chunk is None:
+                    return
+                log.write(chunk)
+
+
+class Log(object):
+    """Memory-mapped view over one or more recorded log files."""
+    def __init__(self, *file_names):
+        self.file_names = file_names
+
+    def _maps(self):
+        for file_name in self.file_names:
+            with open(file_name, 'rb') as log:
+                try:
+                    data = mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    # Empty files cannot be mapped
+                    continue
+                try:
+                    yield data
+                finally:
+                    data.close()
+
+    def __iter__(self):
+        """Iterate (timestamp, session, value, kind) for each record."""
+        for data in self._maps():
+            for offset in range(0, len(data) - RECORD.size + 1, RECORD.size):
+                yield RECORD.unpack_from(data, offset)
+
+    def __len__(self):
+        return sum(len(data) // RECORD.size for data in self._maps())
+
+    def last_session(self):
+        """Highest session id recorded, or None for an empty log."""
+        return max((session for timestamp, session, value, kind in self), default=None)
+
+    def aggregate(self, by_session=False):
+        """Count, total and mean value per kind name.
+
+        With by_session, the same summary is keyed by session id first.
+        """
+        try:
+            counts, totals = self._aggregate_numpy(by_session)
+        except ImportError:
+            counts, totals = self._aggregate_python(by_session)
+        return self._summarize(counts, totals, by_session)
+
+    def _aggregate_numpy(self, by_session):
+        import numpy
+
+        dtype = numpy.dtype([('time', '<f8'), ('session', '<u4'), ('value', '<i4'),
+                             ('kind', 'u1'), ('pad', 'V7')])
+        counts = collections.Counter()
+        totals = collections.Counter()
+        for data in self._maps():
+            records = numpy.frombuffer(data, dtype=dtype,
+                                       count=len(data) // RECORD.size)
+            keys = records['kind'].astype(numpy.int64)
+            if by_session:
+                keys += records['session'].astype(numpy.int64) * len(KINDS)
+            unique, inverse = numpy.unique(keys, return_inverse=True)
+            key_counts = numpy.bincount(inverse)
+            key_totals = numpy.bincount(inverse, weights=records['value'])
+            for key, count, total in zip(unique.tolist(), key_counts.tolist(),
+                                         key_totals.tolist()):
+                counts[key] += count
+                totals[key] += int(total)
+            del records, keys, inverse
+        return counts, totals
+
+    def _aggregate_python(self, by_session):
+        counts = collections.Counter()
+        totals = collections.Counter()
+        for timestamp, session, value, kind in self:
+            key = session * len(KINDS) + kind if by_session else kind
+            counts[key] += 1
+            totals[key] += value
+        return counts, totals
+
+    def _summarize(self, counts, totals, by_session):
+        def summary(key):
+            count, total = counts[key], totals[key]
+            return {
+                'count': count,
+                'total': total,
+                'mean': float(total) / count if count else 0.0,
+            }
+
+        if not by_session:
+            return dict((name, summary(kind)) for kind, name in enumerate(KINDS))
+
+        sessions = set(key // len(KINDS) for key in counts)
+        return dict((session, dict((name, summary(session * len(KINDS) + kind))
+                                   for kind, name in enumerate(KINDS)))
+                    for session in sessions)
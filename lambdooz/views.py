@@ -44,62 +44,119 @@ class Image(object):
 
 
 class Game(object):
+    font_file = 'data/ocr_a.ttf'
+    font_ratio = 0.8
+
     @observer
     def __init__(self, model, surface):
         self.model = model
-        self.surface = surface
-
         self._images = Image.from_directory('data')
-        self._font = pygame.font.Font('data/ocr_a.ttf', 40)
+        self.resize(surface)
+
+    def resize(self, surface):
+        """Fit the board to surface and rebuild every scaled asset.
+
+        Scaling happens once here; drawing a frame only blits from caches.
+        """
+        self.surface = surface
+        columns, rows = self.model.size
+        width, height = surface.get_size()
+        self._cell = max(min(width // columns, height // rows), 1)
+        self._origin = ((width - self._cell * columns) // 2,
+                        (height - self._cell * rows) // 2)
+        self._rows = rows
+
+        # (asset, direction, size) -> pre-scaled surface
+        self._sprites = {}
+        self._background = pygame.transform.smoothscale(
+            self._images['background'].raw,
+            (self._cell * columns, self._cell * rows))
+
+        # Render glyphs at the target point size rather than scaling them
+        self._font = pygame.font.Font(self.font_file,
+                                      max(int(self._cell * self.font_ratio), 1))
+        self._glyphs = {}
 
         self.update()
 
-    def render_text(self, text):
-        return self._font.render(str(text), 1, (255, 255, 255))
+    def sprite(self, asset, direction):
+        key = (asset, direction, self._cell)
+        if key not in self._sprites:
+            image = getattr(self._images[asset], direction)
+            self._sprites[key] = pygame.transform.smoothscale(image, (self._cell, self._cell))
+        return self._sprites[key]
 
-    def draw_upper_left(self, surface):
+    def update(self):
+        self.draw()
+        self.dirty = True
+
+    def glyph(self, char):
+        if char not in self._glyphs:
+            self._glyphs[char] = self._font.render(char, 1, (255, 255, 255))
+        return self._glyphs[char]
+
+    def text_size(self, text):
+        glyphs = [self.glyph(char) for char in str(text)]
+        return (sum(glyph.get_width() for glyph in glyphs),
+                max([glyph.get_height() for glyph in glyphs] or [0]))
+
+    def draw_text(self, text, position):
+        # Blit cached glyphs straight to the display; no per-frame surfaces
+        x, y = position
+        for char in str(text):
+            glyph = self.glyph(char)
+            self.surface.blit(glyph, (x, y))
+            x += glyph.get_width()
+
+    def draw_background(self):
+        self.surface.fill((0, 0, 0))
+        self.surface.blit(self._background, self._origin)
+
+    def draw_upper_left(self, text):
         x, y = self.surface.get_rect().topleft
-        self.surface.blit(surface, (x, y))
+        self.draw_text(text, (x, y))
 
-    def draw_lower_left(self, surface):
-        h = surface.get_rect().h
+    def draw_lower_left(self, text):
+        w, h = self.text_size(text)
         x, y = self.surface.get_rect().bottomleft
-        self.surface.blit(surface, (x, y - h))
+        self.draw_text(text, (x, y - h))
 
-    def draw_upper_right(self, surface):
-        w = surface.get_rect().w
+    def draw_upper_right(self, text):
+        w, h = self.text_size(text)
         x, y = self.surface.get_rect().topright
-        self.surface.blit(surface, (x - w, y))
+        self.draw_text(text, (x - w, y))
 
-    def draw_lower_right(self, surface):
-        w, h = surface.get_rect().size
+    def draw_lower_right(self, text):
+        w, h = self.text_size(text)
         x, y = self.surface.get_rect().bottomright
-        self.surface.blit(surface, (x - w, y - h))
+        self.draw_text(text, (x - w, y - h))
 
-    def draw_pieces(self, pieces):
-        for id, type, position, direction in pieces:
-            image = getattr(self._images[type], direction)
-            position = (position[0] * 50, (11 - position[1]) * 50)
-            self.surface.blit(image, position)
+    def draw_pieces(self, state):
+        x0, y0 = self._origin
+        for type, x, y, direction, id in state:
+            sprite = self.sprite(models.EXPORT_TYPES[type],
+                                 models.EXPORT_DIRECTIONS[direction])
+            self.surface.blit(sprite, (x0 + x * self._cell,
+                                       y0 + (self._rows - 1 - y) * self._cell))
 
     def synchronize(self, duration):
         pass
 
 
 class Marathon(Game):
-    def update(self):
-        self.surface.blit(self._images['background'].raw, (0, 0))
+    def draw(self):
+        self.draw_background()
 
-        self.draw_pieces(self.model.pieces)
-        self.draw_upper_left(self.render_text('%010d' % self.model.score))
-        self.draw_upper_right(self.render_text(self.model.quota))
-        self.draw_lower_right(self.render_text(self.model.level))
+        self.draw_pieces(self.model.export())
+        self.draw_upper_left('%010d' % self.model.score)
+        self.draw_upper_right(self.model.quota)
+        self.draw_lower_right(self.model.level)
 
 
 class Timed(Game):
-    def update(self):
-        self.surface.blit(self._images['background'].raw, (0, 0))
+    def draw(self):
+        self.draw_background()
 
-        self.draw_pieces(self.model.pieces)
-        self.draw_upper_left(self.render_text('%010d' % self.model.score))
-        self.draw_lower_right(self.render_text(self.model.time_left))
+        self.draw_pieces(self.model.export())
+        self.draw_upper_left('%010d' % self.model.score)
+        self.draw_lower_right(self.model.time_left)
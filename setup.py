@@ -8,6 +8,7 @@ args = {
 
 setuptools_args = {
     'install_requires': ['decorator', 'pygame'],
+    'python_requires': '>=3.8',
 }
 
 try:
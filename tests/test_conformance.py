@@ -0,0 +1,65 @@
+from lambdooz import conformance, models
+
+
+class OverScoring(models.Marathon):
+    def attack(self, *args, **kwargs):
+        models.Marathon.attack(self, *args, **kwargs)
+        self.score += 1
+
+
+class BrokenEngine(object):
+    Marathon = OverScoring
+    GameOver = models.GameOver
+
+
+class CrashingAttack(models.Marathon):
+    def attack(self, *args, **kwargs):
+        raise IndexError('attack')
+
+
+class CrashingEngine(object):
+    Marathon = CrashingAttack
+    GameOver = models.GameOver
+
+
+class CrashingConstructor(object):
+    GameOver = models.GameOver
+
+    def Marathon(self, *args):
+        raise ValueError('no game')
+
+
+class TestConformance(object):
+    def test_random_actions_reproducible(self):
+        assert conformance.random_actions(7, 100) == conformance.random_actions(7, 100)
+
+    def test_engines_match_reference(self):
+        for engine in conformance.ENGINES:
+            for seed in range(5):
+                report = conformance.check(engine, seed, count=200)
+                assert report.trace == []
+                assert report.step is None
+
+    def test_divergence_shrinks_to_minimal_trace(self):
+        report = conformance.check(BrokenEngine, 0, count=200)
+        assert report.trace == [('attack', 0)]
+        assert report.step == 1
+        assert report.expected[1] + 1 == report.actual[1]
+
+    def test_crash_is_a_divergence(self):
+        report = conformance.check(CrashingEngine, 0, count=200)
+        assert report.trace == [('attack', 0)]
+        assert report.step == 1
+        assert report.expected[-1] is None
+        assert report.actual[-1] == 'IndexError'
+
+    def test_crash_on_construction(self):
+        report = conformance.check(CrashingConstructor(), 0, count=20)
+        assert report.trace == []
+        assert report.step == 0
+        assert report.actual[-1] == 'ValueError'
+
+    def test_random_state_is_isolated(self):
+        state = conformance.random.getstate()
+        conformance.check(models, 3, count=50)
+        assert conformance.random.getstate() == state
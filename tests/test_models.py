@@ -1,6 +1,18 @@
-from py.test import raises
+import itertools
 
-from lambdooz import models
+import pytest
+from pytest import raises
+
+from lambdooz import conformance, models
+from lambdooz.mvc import observer
+
+
+@pytest.fixture(autouse=True, params=conformance.ENGINES,
+                ids=lambda engine: engine.__name__)
+def engine(request, monkeypatch):
+    """Run every case against each engine in conformance.ENGINES."""
+    monkeypatch.setitem(globals(), 'models', request.param)
+    return request.param
 
 class TestCoord(object):
     def setup_method(self, method):
@@ -80,7 +92,8 @@ class TestLine(object):
 
     def test_too_many_pieces_added(self):
         self.line.fill()
-        raises(models.TooManyPieces, 'self.line.add()')
+        with raises(models.TooManyPieces):
+            self.line.add()
 
     def test_only_add_listed_types(self):
         self.line.fill()
@@ -95,7 +108,7 @@ class TestLine(object):
 
     def test_add_previous(self):
         for type in self.test_types:
-            line = models.Line(max, [None])
+            line = models.Line(self.line.max, [None])
             line.add(type)
             assert [piece.type for piece in line] == [type]
 
@@ -105,7 +118,7 @@ class TestLine(object):
     def test_add_piece_if_no_previous(self):
         base_types = [None] * 100
         for type in self.test_types:
-            line = models.Line(max, base_types + [type])
+            line = models.Line(self.line.max, base_types + [type])
             line.add()
             assert [piece.type for piece in line] == [type]
 
@@ -122,6 +135,26 @@ class TestLine(object):
         assert self.line.intersect(player) == 0
         assert len(self.line) == self.line.max
 
+    def runs(self, line):
+        return [[type, len(list(group))] for type, group in
+                itertools.groupby(piece.type for piece in reversed(list(line)))]
+
+    def test_run_index_follows_add_and_intersect(self):
+        for x in range(20):
+            self.line.add()
+            assert list(self.line._runs) == self.runs(self.line)
+
+        for type in self.line.types * 10:
+            self.line.intersect(models.Player(type))
+            assert list(self.line._runs) == self.runs(self.line)
+
+    def test_preview_matches_intersect(self):
+        for type in self.line.types * 10:
+            self.line.fill()
+            expected = self.line.preview(type)
+            assert len(self.line) == self.line.max
+            assert self.line.intersect(models.Player(type)) == expected
+
 
 class TestPlane(object):
     def setup_method(self, method):
@@ -235,3 +268,207 @@ class TestBoard(object):
         assert self.board.offset('down', models.Coord(1, 0)) == models.Coord(3, 0)
         assert self.board.offset('down', models.Coord(0, 1)) == models.Coord(2, 1)
         assert self.board.offset('down', models.Coord(1, 1)) == models.Coord(3, 1)
+
+    def test_size(self):
+        assert self.board.size == (6, 6)
+
+    def test_previews_have_no_side_effects(self):
+        self.board.fill()
+        before = [(id(piece), piece.type, position, direction)
+                  for piece, position, direction in self.board]
+
+        previews = self.board.previews(0)
+        assert len(previews) == self.player_x * self.player_y * 4
+        assert [(id(piece), piece.type, position, direction)
+                for piece, position, direction in self.board] == before
+
+    def test_preview_matches_attack(self):
+        self.board.fill()
+        for direction in ['left', 'up', 'right', 'down']:
+            self.board.move(0, direction)
+            position = self.board._player_positions[0]
+            expected = self.board.preview(0, position, direction)
+            assert self.board.attack(0) == expected
+
+
+class TestScheduler(object):
+    def setup_method(self, method):
+        self.scheduler = models.Scheduler()
+        self.fired = []
+
+    def fire(self, name, repeat=None):
+        def callback():
+            self.fired.append((name, self.scheduler.now))
+            if repeat:
+                self.scheduler.schedule(repeat, callback)
+        return callback
+
+    def test_advance_runs_due_events_in_order(self):
+        self.scheduler.schedule(20, self.fire('b'))
+        self.scheduler.schedule(10, self.fire('a'))
+        self.scheduler.schedule(30, self.fire('c'))
+
+        self.scheduler.advance(25)
+        assert self.fired == [('a', 10), ('b', 20)]
+        assert self.scheduler.remaining() == 5
+
+    def test_repeating_event_keeps_time(self):
+        self.scheduler.schedule(10, self.fire('tick', repeat=10))
+
+        for x in range(7):
+            self.scheduler.advance(6)
+        assert self.fired == [('tick', 10), ('tick', 20), ('tick', 30), ('tick', 40)]
+
+    def test_scale(self):
+        self.scheduler.schedule(10, self.fire('a'))
+
+        self.scheduler.scale = 0
+        self.scheduler.advance(100)
+        assert self.fired == []
+        assert self.scheduler.remaining() is None
+
+        self.scheduler.scale = 2
+        assert self.scheduler.remaining() == 5
+        self.scheduler.advance(5)
+        assert self.fired == [('a', 10)]
+
+    def test_skip(self):
+        self.scheduler.schedule(40, self.fire('a'))
+
+        assert self.scheduler.skip() == 40
+        assert self.fired == [('a', 40)]
+        assert self.scheduler.skip() == 0
+
+
+class TestMarathon(object):
+    def setup_method(self, method):
+        self.sync = 100
+        self.acceleration = 10
+        self.marathon = models.Marathon(self.sync, self.acceleration)
+
+    def test_spawns_on_schedule(self):
+        delay = self.sync - self.acceleration
+        self.marathon.synchronize(delay - 1)
+        assert len(self.marathon._board) == 0
+
+        self.marathon.synchronize(1)
+        assert len(self.marathon._board) == 1
+
+    def test_skip_spawns_next_piece(self):
+        self.marathon.scheduler.skip()
+        assert len(self.marathon._board) == 1
+
+
+class TestTimed(object):
+    def test_clock_ticks(self):
+        timed = models.Timed(100, 3)
+        timed.synchronize(250)
+        assert timed.time_left == 1
+
+        with raises(models.GameOver):
+            timed.synchronize(50)
+
+    def test_observers_see_final_time(self):
+        class Watcher(object):
+            @observer
+            def __init__(self, model):
+                self.seen = []
+                self.model = model
+
+            def update(self):
+                self.seen.append(self.model.time_left)
+
+        timed = models.Timed(100, 2)
+        watcher = Watcher(timed)
+        with raises(models.GameOver):
+            timed.synchronize(200)
+        assert watcher.seen == [1, 0]
+
+
+class TestBoardState(object):
+    def setup_method(self, method):
+        self.marathon = models.Marathon(100, 10)
+        self.state = self.marathon.export()
+
+    def exported(self):
+        return sorted((models.EXPORT_TYPES[type], (x, y),
+                       models.EXPORT_DIRECTIONS[direction], id)
+                      for type, x, y, direction, id in self.state)
+
+    def pieces(self):
+        return sorted((type, position, direction, id)
+                      for id, type, position, direction in self.marathon.pieces)
+
+    def test_shared(self):
+        assert self.marathon.export() is self.state
+
+    def test_matches_pieces(self):
+        self.marathon.synchronize(1000)
+        assert self.exported() == self.pieces()
+
+    def test_updated_in_place(self):
+        view = self.state.view
+        version = self.state.version
+
+        self.marathon.move(0, 'up')
+        assert self.state.version == version + 1
+        assert self.exported() == self.pieces()
+
+        type, x, y, direction, id = [row for row in view.tolist() if row[0] != models.EMPTY][0]
+        assert models.EXPORT_DIRECTIONS[direction] == 'up'
+
+    def test_version_unchanged_without_mutation(self):
+        version = self.state.version
+        list(self.marathon.pieces)
+        assert self.state.version == version
+
+    def test_fresh_for_earlier_observers(self):
+        marathon = models.Marathon(100, 10)
+
+        class Reader(object):
+            @observer
+            def __init__(self, model):
+                self.model = model
+                self.seen = []
+
+            def update(self):
+                state = self.model.export()
+                self.seen.append([models.EXPORT_DIRECTIONS[direction]
+                                  for type, x, y, direction, id in state
+                                  if models.EXPORT_TYPES[type].startswith('player')])
+
+        reader = Reader(marathon)
+        state = marathon.export()
+        version = state.version
+
+        marathon.move(0, 'up')
+        marathon.move(0, 'left')
+        assert reader.seen == [['up'], ['left']]
+        assert state.version == version + 2
+
+    def test_view_is_read_only(self):
+        view = self.state.view
+        assert view.readonly
+        assert view.shape == (len(self.state), len(models.EXPORT_FIELDS))
+
+    def test_as_numpy(self):
+        numpy = pytest.importorskip('numpy')
+        cells = self.state.as_numpy()
+
+        assert list(cells.dtype.names) == models.EXPORT_FIELDS
+        assert len(cells) == len(self.state)
+        assert not cells.flags.writeable
+        assert numpy.shares_memory(cells, numpy.asarray(self.state.view))
+
+        self.marathon.move(0, 'up')
+        occupied = cells[cells['type'] != models.EMPTY]
+        assert models.EXPORT_DIRECTIONS[occupied['direction'][0]] == 'up'
+
+    def test_version_unchanged_without_board_change(self):
+        timed = models.Timed(100, 5)
+        state = timed.export()
+        version = state.version
+
+        timed.synchronize(100)
+        assert timed.time_left == 4
+        assert state.version == version
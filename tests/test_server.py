@@ -0,0 +1,136 @@
+import asyncio
+
+from lambdooz import models, server
+
+
+def play(factory, script):
+    # Built outside the loop, as server.main() does
+    host = server.Host(factory)
+
+    async def run():
+        listener = await host.serve_tcp()
+        ticker = asyncio.get_running_loop().create_task(host.run())
+        port = listener.sockets[0].getsockname()[1]
+        client = await server.Client.open_tcp('127.0.0.1', port)
+        try:
+            return await asyncio.wait_for(script(host, client), 5)
+        finally:
+            client.close()
+            ticker.cancel()
+            listener.close()
+    return asyncio.run(run())
+
+
+class TestHost(object):
+    def test_initial_frame(self):
+        async def script(host, client):
+            return await client.receive()
+
+        frame = play(None, script)
+        assert frame['score'] == 0
+        assert frame['level'] == 1
+        assert [type for type, x, y, direction in frame['pieces']] == ['player0']
+
+    def test_input_is_applied(self):
+        async def script(host, client):
+            await client.receive()
+            client.move('up')
+            return await client.receive()
+
+        frame = play(None, script)
+        type, x, y, direction = frame['pieces'][0]
+        assert direction == 'up'
+
+    def test_timers_spawn_pieces(self):
+        async def script(host, client):
+            frames = [await client.receive() for x in range(3)]
+            return frames, host.report()
+
+        frames, report = play(lambda: models.Marathon(30, 10), script)
+        assert [len(frame['pieces']) for frame in frames] == [1, 2, 3]
+        assert report['sessions'] == 1
+        assert 0 <= report['cpu_load']
+        assert report['sessions_per_core'] is None or report['sessions_per_core'] > 0
+        assert report['ticks'] >= 2
+        assert report['max_tick_latency'] >= 0
+
+    def test_game_over(self):
+        async def script(host, client):
+            frame = await client.receive()
+            while not frame.get('game_over'):
+                frame = await client.receive()
+            return frame, await client.receive()
+
+        frame, closed = play(lambda: models.Timed(10, 2), script)
+        assert frame['time_left'] == 0
+        assert closed is None
+
+    def test_pieces_only_sent_when_board_changes(self):
+        async def script(host, client):
+            return await client.receive(), await client.receive()
+
+        first, second = play(lambda: models.Timed(10, 5), script)
+        assert 'pieces' in first
+        assert 'pieces' not in second
+        assert second['time_left'] == 4
+
+
+class FakeTransport(object):
+    def __init__(self):
+        self.buffered = 0
+        self.aborted = False
+
+    def get_write_buffer_size(self):
+        return self.buffered
+
+    def abort(self):
+        self.aborted = True
+
+
+class FakeWriter(object):
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.frames = []
+        self.closed = False
+
+    def write(self, data):
+        self.frames.append(data)
+
+    def close(self):
+        self.closed = True
+
+
+class TestTick(object):
+    def setup_method(self, method):
+        self.host = server.Host(lambda: models.Marathon(100, 10), max_backlog=1000)
+
+    def add_session(self, model=None):
+        writer = FakeWriter()
+        session = server.Session(model or self.host.factory(), writer, 0)
+        self.host.sessions.add(session)
+        self.host._notify(session)
+        return session
+
+    def test_slow_client_is_dropped(self):
+        slow = self.add_session()
+        fast = self.add_session()
+        slow.writer.transport.buffered = 1001
+
+        self.host.tick(0)
+        assert slow.writer.transport.aborted
+        assert self.host.sessions == set([fast])
+        assert self.host.report()['dropped'] == 1
+
+    def test_error_only_closes_its_session(self):
+        broken = self.add_session()
+        healthy = self.add_session()
+
+        def synchronize(duration):
+            raise RuntimeError('broken model')
+        broken.model.synchronize = synchronize
+
+        self.host.tick(0)
+        assert broken.writer.transport.aborted
+        assert self.host.sessions == set([healthy])
+        assert healthy.writer.frames
+        assert self.host.report()['failed'] == 1
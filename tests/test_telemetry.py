@@ -0,0 +1,162 @@
+import os
+import tempfile
+
+import pytest
+
+from lambdooz import models, telemetry
+
+
+class TestRecorder(object):
+    def setup_method(self, method):
+        fd, self.file_name = tempfile.mkstemp()
+        os.close(fd)
+
+    def teardown_method(self, method):
+        os.remove(self.file_name)
+
+    def test_fixed_width_records(self):
+        recorder = telemetry.Recorder(self.file_name, buffer_size=1)
+        recorder.record(telemetry.SPAWN)
+        recorder.record(telemetry.CLEAR, 3)
+        recorder.close()
+
+        assert os.path.getsize(self.file_name) == 2 * telemetry.RECORD.size
+
+    def test_buffered_until_flush(self):
+        recorder = telemetry.Recorder(self.file_name)
+        recorder.record(telemetry.FRAME, 16)
+        assert os.path.getsize(self.file_name) == 0
+
+        recorder.close()
+        assert os.path.getsize(self.file_name) == telemetry.RECORD.size
+
+    def test_log_round_trip(self):
+        recorder = telemetry.Recorder(self.file_name)
+        recorder.record(telemetry.CLEAR, 3)
+        recorder.record(telemetry.LEVEL_UP, 2)
+        recorder.close()
+
+        log = telemetry.Log(self.file_name)
+        assert len(log) == 2
+        assert [(kind, value) for timestamp, session, value, kind in log] == \
+               [(telemetry.CLEAR, 3), (telemetry.LEVEL_UP, 2)]
+
+    def test_aggregate(self):
+        recorder = telemetry.Recorder(self.file_name)
+        for duration in (10, 20, 30):
+            recorder.record(telemetry.FRAME, duration)
+        recorder.record(telemetry.CLEAR, 4)
+        recorder.close()
+
+        aggregates = telemetry.Log(self.file_name).aggregate()
+        assert aggregates['frame'] == {'count': 3, 'total': 60, 'mean': 20.0}
+        assert aggregates['clear'] == {'count': 1, 'total': 4, 'mean': 4.0}
+        assert aggregates['spawn']['count'] == 0
+
+    def test_aggregate_numpy_matches_python(self):
+        pytest.importorskip('numpy')
+        recorder = telemetry.Recorder(self.file_name)
+        for value in range(100):
+            recorder.record(value % len(telemetry.KINDS), value)
+        recorder.close()
+
+        log = telemetry.Log(self.file_name, self.file_name)
+        for by_session in (False, True):
+            assert log._aggregate_numpy(by_session) == log._aggregate_python(by_session)
+        counts, totals = log._aggregate_numpy(False)
+        assert counts[telemetry.SPAWN] == 40
+
+    def test_aggregate_by_session(self):
+        recorder = telemetry.Recorder(self.file_name)
+        first, second = recorder.new_session(), recorder.new_session()
+        recorder.record(telemetry.CLEAR, 3, first)
+        recorder.record(telemetry.CLEAR, 5, second)
+        recorder.record(telemetry.CLEAR, 1, second)
+        recorder.close()
+
+        sessions = telemetry.Log(self.file_name).aggregate(by_session=True)
+        assert sorted(sessions) == [first, second]
+        assert sessions[first]['clear'] == {'count': 1, 'total': 3, 'mean': 3.0}
+        assert sessions[second]['clear'] == {'count': 2, 'total': 6, 'mean': 3.0}
+        assert sessions[second]['spawn']['count'] == 0
+
+    def test_sessions_continue_after_existing_log(self):
+        recorder = telemetry.Recorder(self.file_name)
+        assert [recorder.new_session() for x in range(3)] == [0, 1, 2]
+        recorder.record(telemetry.SPAWN, 0, 2)
+        recorder.close()
+
+        recorder = telemetry.Recorder(self.file_name)
+        assert recorder.new_session() == 3
+        recorder.close()
+
+    def test_empty_log(self):
+        log = telemetry.Log(self.file_name)
+        assert len(log) == 0
+        assert log.aggregate()['frame']['count'] == 0
+
+
+class ListRecorder(object):
+    def __init__(self):
+        self.records = []
+        self.sessions = []
+        self._next = 0
+
+    def new_session(self):
+        self._next += 1
+        return self._next
+
+    def record(self, kind, value=0, session=0):
+        self.records.append((kind, value))
+        self.sessions.append(session)
+
+    def kinds(self):
+        return [kind for kind, value in self.records]
+
+
+class TestGameTelemetry(object):
+    def setup_method(self, method):
+        self.recorder = ListRecorder()
+
+    def test_games_record_their_own_session(self):
+        first = models.Marathon(100, 10, recorder=self.recorder)
+        second = models.Timed(100, 5, recorder=self.recorder)
+        assert first.session != second.session
+
+        first.synchronize(10)
+        second.synchronize(10)
+        assert self.recorder.sessions == [first.session, second.session]
+
+    def test_marathon_spawn_and_frame(self):
+        marathon = models.Marathon(100, 10, recorder=self.recorder)
+        marathon.synchronize(90)
+        assert self.recorder.records == [(telemetry.FRAME, 90), (telemetry.SPAWN, 0)]
+
+    def test_marathon_clear_counts_intersect(self):
+        marathon = models.Marathon(100, 10, recorder=self.recorder)
+        marathon._board.fill()
+        expected = marathon._board.preview(0, models.Coord(0, 0), 'left')
+
+        marathon.attack(0)
+        assert self.recorder.records == [(telemetry.CLEAR, expected)]
+
+    def test_marathon_level_up(self):
+        marathon = models.Marathon(100, 10, recorder=self.recorder)
+        marathon.quota = 0
+        marathon.attack(0)
+        assert self.recorder.records[-1] == (telemetry.LEVEL_UP, 2)
+
+    def test_marathon_game_over(self):
+        marathon = models.Marathon(100, 10, recorder=self.recorder)
+        marathon._board.fill()
+        with pytest.raises(models.GameOver):
+            marathon.synchronize(90)
+        assert self.recorder.kinds() == [telemetry.FRAME, telemetry.GAME_OVER]
+
+    def test_timed(self):
+        timed = models.Timed(100, 1, recorder=self.recorder)
+        timed.attack(0)
+        with pytest.raises(models.GameOver):
+            timed.synchronize(100)
+        assert self.recorder.kinds() == [telemetry.CLEAR, telemetry.FRAME,
+                                         telemetry.GAME_OVER]